@@ -0,0 +1,52 @@
+import os
+import pytest
+
+from valve_linkml.import_resolver import resolve_schema_view
+from valve_linkml.check_mapping import check_schema_mapping, find_schema_mapping_errors, read_schema_tables
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERSONINFO_SCHEMA_PATH = os.path.join(BASE_DIR, "linkml_input", "personinfo", "personinfo.yaml")
+PERSONINFO_OUTPUT_DIR = os.path.join(BASE_DIR, "valve_output", "personinfo")
+
+@pytest.fixture(scope="module")
+def linkml_schema():
+    return resolve_schema_view(PERSONINFO_SCHEMA_PATH)
+
+@pytest.fixture
+def mapped_schema_tables():
+    return read_schema_tables(PERSONINFO_OUTPUT_DIR)
+
+def get_column(mapped_schema_tables: dict, table_name: str, column_name: str) -> dict:
+    return next(c for c in mapped_schema_tables["column"]["rows"] if c["table"] == table_name and c["column"] == column_name)
+
+
+def test_mapping_is_consistent(linkml_schema, mapped_schema_tables):
+    check_schema_mapping(linkml_schema, mapped_schema_tables)
+
+def test_slot_usage_column_datatype(linkml_schema, mapped_schema_tables):
+    get_column(mapped_schema_tables, "Person", "primary_email")["datatype"] = "text"
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    assert errors == ["LinkML slot_usage Person.primary_email not found as a Column table row with datatype 'person_primary_email'"]
+
+def test_slot_usage_datatype(linkml_schema, mapped_schema_tables):
+    datatype_rows = mapped_schema_tables["datatype"]["rows"]
+    mapped_schema_tables["datatype"]["rows"] = [d for d in datatype_rows if d["datatype"] != "person_primary_email"]
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    assert errors == ["LinkML slot_usage Person.primary_email not found as datatype 'person_primary_email' in Datatype table"]
+
+def test_multivalued_slot_range(linkml_schema, mapped_schema_tables):
+    get_column(mapped_schema_tables, "MedicalEvent", "person")["structure"] = ""
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    assert errors == ["LinkML multivalued slot Person.has_medical_history not found as foreign key column MedicalEvent.person in Column table"]
+
+def test_class_slot_range(linkml_schema, mapped_schema_tables):
+    get_column(mapped_schema_tables, "Person", "current_address")["structure"] = ""
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    assert errors == ["LinkML slot current_address range Address not found in any foreign key 'structure' in Column table"]
+
+def test_foreign_key_without_primary_key(linkml_schema, mapped_schema_tables):
+    get_column(mapped_schema_tables, "Address", "id")["structure"] = ""
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    assert errors == ["Column table row Address.id corresponding to foreign key 'structure' from(Address.id) does not have primary key 'structure'"]
+    with pytest.raises(Exception, match="1 schema mapping errors"):
+        check_schema_mapping(linkml_schema, mapped_schema_tables)
@@ -0,0 +1,111 @@
+import os
+import pytest
+
+from valve_linkml.check_mapping import read_schema_tables
+from valve_linkml.data_generator import default_error_config
+from valve_linkml.error_injection import (inject_errors_in_batches, read_error_config, validate_error_config, INVALID_VALUE,
+                                          REGEX_ERROR, FOREIGN_KEY_ERROR, REQUIRED_ERROR, PRIMARY_KEY_ERROR)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERSONINFO_OUTPUT_DIR = os.path.join(BASE_DIR, "valve_output", "personinfo")
+
+ERROR_CONFIG = [
+    {"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.1},
+    {"table": "Person", "column": "primary_email", "type": REGEX_ERROR, "rate": 0.05},
+    {"table": "Person", "column": "current_address", "type": FOREIGN_KEY_ERROR, "rate": 0.03},
+    {"table": "Person", "column": "name", "type": REQUIRED_ERROR, "rate": 0.02},
+]
+
+def generate_batches(batch_count: int, batch_size: int):
+    return ([{"id": str(b * batch_size + i), "primary_email": "a@example.com", "current_address": "1", "name": "a"} for i in range(batch_size)]
+            for b in range(batch_count))
+
+def inject(seed: int, batch_count: int = 3, batch_size: int = 1000, error_config: list = ERROR_CONFIG):
+    error_counts = {}
+    rows = [row for batch in inject_errors_in_batches(generate_batches(batch_count, batch_size), "Person", error_config, seed, error_counts)
+            for row in batch]
+    return rows, error_counts
+
+
+def test_same_seed_same_errors():
+    rows, error_counts = inject(seed=42)
+    seeded_rows, seeded_error_counts = inject(seed=42)
+    assert rows == seeded_rows
+    assert error_counts == seeded_error_counts
+    other_rows, _ = inject(seed=43)
+    assert rows != other_rows
+
+def test_error_counts_match_config():
+    rows, error_counts = inject(seed=42)
+    assert error_counts == {("id", PRIMARY_KEY_ERROR): 300, ("primary_email", REGEX_ERROR): 150,
+                            ("current_address", FOREIGN_KEY_ERROR): 90, ("name", REQUIRED_ERROR): 60}
+    ids = [row["id"] for row in rows]
+    assert len(ids) - len(set(ids)) == 300
+    assert sum(row["primary_email"] == INVALID_VALUE for row in rows) == 150
+    assert sum(row["current_address"] == INVALID_VALUE for row in rows) == 90
+    assert sum(row["name"] is None for row in rows) == 60
+
+def test_error_counts_over_small_batches():
+    # floor(999 * 0.001) is 0 per batch, but the stream still gets floor(9990 * 0.001) errors
+    error_config = [{"table": "Person", "column": "primary_email", "type": REGEX_ERROR, "rate": 0.001}]
+    rows, error_counts = inject(seed=42, batch_count=10, batch_size=999, error_config=error_config)
+    assert error_counts == {("primary_email", REGEX_ERROR): 9}
+    assert sum(row["primary_email"] == INVALID_VALUE for row in rows) == 9
+
+def test_primary_key_errors_over_single_row_batches():
+    error_config = [{"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.5}]
+    rows, error_counts = inject(seed=42, batch_count=10, batch_size=1, error_config=error_config)
+    # Single row batches have nothing to duplicate, so primary key errors can't be added
+    assert error_counts == {("id", PRIMARY_KEY_ERROR): 0}
+    rows, error_counts = inject(seed=42, batch_count=5, batch_size=2, error_config=error_config)
+    assert error_counts == {("id", PRIMARY_KEY_ERROR): 5}
+
+def test_errors_on_the_same_column():
+    error_config = [{"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.3},
+                    {"table": "Person", "column": "id", "type": REQUIRED_ERROR, "rate": 0.3}]
+    rows, error_counts = inject(seed=42, error_config=error_config)
+    assert error_counts == {("id", PRIMARY_KEY_ERROR): 900, ("id", REQUIRED_ERROR): 900}
+    ids = [row["id"] for row in rows if row["id"] is not None]
+    assert len(rows) - len(ids) == 900
+    assert len(ids) - len(set(ids)) == 900
+
+def test_validate_error_config():
+    schema_tables = read_schema_tables(PERSONINFO_OUTPUT_DIR)
+    column_rows = schema_tables["column"]["rows"]
+    datatype_rows = schema_tables["datatype"]["rows"]
+    validate_error_config([
+        {"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.1},
+        {"table": "Person", "column": "primary_email", "type": REGEX_ERROR, "rate": 0.05},
+        {"table": "Person", "column": "current_address", "type": FOREIGN_KEY_ERROR, "rate": 0.03},
+        {"table": "FamilialRelationship", "column": "related_to", "type": REQUIRED_ERROR, "rate": 0.02},
+    ], column_rows, datatype_rows)
+
+    invalid_configs = [
+        ({"table": "Person", "column": "missing", "type": REGEX_ERROR, "rate": 0.1}, "not found in Column table"),
+        ({"table": "Person", "column": "name", "type": REGEX_ERROR, "rate": 0.1}, "no condition of datatype 'string'"),
+        ({"table": "Person", "column": "primary_email", "type": REQUIRED_ERROR, "rate": 0.1}, "nulltype 'empty'"),
+        ({"table": "Person", "column": "name", "type": FOREIGN_KEY_ERROR, "rate": 0.1}, "no from\\(\\) structure"),
+        ({"table": "Person", "column": "name", "type": PRIMARY_KEY_ERROR, "rate": 0.1}, "isn't a primary key"),
+        ({"table": "Person", "column": "id", "type": "typo", "rate": 0.1}, "must be one of"),
+        ({"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 1}, "must be in"),
+    ]
+    for error_spec, message in invalid_configs:
+        with pytest.raises(ValueError, match=message):
+            validate_error_config([error_spec], column_rows, datatype_rows)
+    with pytest.raises(ValueError, match="Error rates of Person.id add up to 1.0"):
+        validate_error_config([{"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.5},
+                               {"table": "Person", "column": "id", "type": REQUIRED_ERROR, "rate": 0.5}], column_rows, datatype_rows)
+
+def test_validate_default_error_config():
+    schema_tables = read_schema_tables(PERSONINFO_OUTPUT_DIR)
+    error_config = default_error_config(schema_tables["table"]["rows"])
+    assert error_config
+    validate_error_config(error_config, schema_tables["column"]["rows"], schema_tables["datatype"]["rows"])
+
+def test_read_error_config_headers(tmp_path):
+    config_path = tmp_path / "errors.tsv"
+    config_path.write_text("table\tcolumn\ttype\nPerson\tid\tprimary_key\n")
+    with pytest.raises(ValueError, match="missing the columns: rate"):
+        read_error_config(str(config_path))
+    config_path.write_text("table\tcolumn\ttype\trate\nPerson\tid\tprimary_key\t0.1\n")
+    assert read_error_config(str(config_path)) == [{"table": "Person", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.1}]
@@ -0,0 +1,60 @@
+import os
+import pytest
+from linkml_runtime.utils.schemaview import SchemaView
+
+import valve_linkml.import_resolver
+from valve_linkml.import_resolver import resolve_schema_view
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERSONINFO_SCHEMA_PATH = os.path.join(BASE_DIR, "linkml_input", "personinfo", "personinfo.yaml")
+
+def write_schema(path: str, name: str, imports: list, classes: list = []):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as schema_file:
+        schema_file.write(f"id: https://example.org/{name}\nname: {name}\n")
+        schema_file.write("imports:\n" + "".join(f"  - {i}\n" for i in imports))
+        if classes:
+            schema_file.write("classes:\n" + "".join(f"  {c}:\n    description: {c}\n" for c in classes))
+
+
+def test_resolves_same_schema_as_schemaview():
+    resolved_schema = resolve_schema_view(PERSONINFO_SCHEMA_PATH)
+    schema = SchemaView(PERSONINFO_SCHEMA_PATH)
+    assert list(resolved_schema.all_classes()) == list(schema.all_classes())
+    assert list(resolved_schema.all_slots()) == list(schema.all_slots())
+    assert list(resolved_schema.all_types()) == list(schema.all_types())
+
+def test_import_dir_and_relative_imports(tmp_path):
+    write_schema(str(tmp_path / "schema" / "root.yaml"), "root", ["linkml:types", "core", "ext:extra"], ["Root"])
+    write_schema(str(tmp_path / "schema" / "core.yaml"), "core", ["linkml:types"], ["Core"])
+    write_schema(str(tmp_path / "mirror" / "ext" / "extra.yaml"), "extra", [], ["Extra"])
+    schema = resolve_schema_view(str(tmp_path / "schema" / "root.yaml"), import_dir=str(tmp_path / "mirror"))
+    assert set(schema.all_classes()) == {"Root", "Core", "Extra"}
+    assert "string" in schema.all_types()
+
+def test_unresolved_import(tmp_path):
+    write_schema(str(tmp_path / "root.yaml"), "root", ["https://example.org/remote"])
+    with pytest.raises(Exception, match="could not be resolved offline"):
+        resolve_schema_view(str(tmp_path / "root.yaml"))
+
+def test_import_name_collision(tmp_path):
+    write_schema(str(tmp_path / "root.yaml"), "root", ["a/module", "b/module"])
+    for d in ["a", "b"]:
+        write_schema(str(tmp_path / d / "module.yaml"), f"{d}_module", ["core"])
+        write_schema(str(tmp_path / d / "core.yaml"), f"{d}_core", [], [f"{d.upper()}Core"])
+    with pytest.raises(Exception, match="Import 'core' resolves to both"):
+        resolve_schema_view(str(tmp_path / "root.yaml"))
+
+def test_cache(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    schema = resolve_schema_view(PERSONINFO_SCHEMA_PATH, cache_dir=cache_dir)
+    # personinfo and linkml:types
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Cached schemas aren't parsed again
+    def parse_schema(content, yaml_schema_path):
+        raise AssertionError(f"'{yaml_schema_path}' was parsed instead of loaded from the cache")
+    monkeypatch.setattr(valve_linkml.import_resolver, "parse_schema", parse_schema)
+    cached_schema = resolve_schema_view(PERSONINFO_SCHEMA_PATH, cache_dir=cache_dir)
+    assert list(cached_schema.all_classes()) == list(schema.all_classes())
+    assert list(cached_schema.all_types()) == list(schema.all_types())
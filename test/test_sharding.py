@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import pytest
+
+from valve_linkml.sharding import write_sharded_tsv, load_shards_into_sqlite, remove_shards, manifest_path, shard_path
+from valve_linkml.linkml2valve import serialize_data_tables
+
+HEADERS = ["id", "name"]
+
+def generate_rows(row_count: int):
+    return [{"id": f"P:{i}", "name": f"Person {i}"} for i in range(row_count)]
+
+def split_batches(rows: list, batch_sizes: list):
+    start = 0
+    for batch_size in batch_sizes:
+        yield rows[start:start + batch_size]
+        start += batch_size
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_shards_in_row_order(tmp_path, max_workers):
+    table_path = str(tmp_path / "Person.tsv")
+    rows = generate_rows(25)
+    # Batches that don't line up with shards
+    manifest_rows = write_sharded_tsv(table_path, split_batches(rows, [7, 7, 11]), HEADERS, 10, max_workers)
+    assert [(m["first_row"], m["row_count"]) for m in manifest_rows] == [(0, 10), (10, 10), (20, 5)]
+
+    db_path = str(tmp_path / "person.db")
+    assert load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id", max_workers) == 25
+    with sqlite3.connect(db_path) as connection:
+        loaded_rows = connection.execute('SELECT row_number, id, name FROM "Person" ORDER BY row_number').fetchall()
+    assert loaded_rows == [(i, row["id"], row["name"]) for i, row in enumerate(rows)]
+
+def test_duplicate_primary_key_in_later_shard(tmp_path):
+    table_path = str(tmp_path / "Person.tsv")
+    rows = generate_rows(25)
+    rows[22]["id"] = rows[3]["id"]
+    write_sharded_tsv(table_path, [rows], HEADERS, 10)
+    with pytest.raises(Exception, match="Loading shard '.*Person.00002.tsv' into 'Person' failed"):
+        load_shards_into_sqlite(manifest_path(table_path), str(tmp_path / "person.db"), "Person", "id")
+
+def test_load_into_existing_table(tmp_path):
+    table_path = str(tmp_path / "Person.tsv")
+    db_path = str(tmp_path / "person.db")
+    write_sharded_tsv(table_path, [generate_rows(25)], HEADERS, 10)
+    load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id")
+    with pytest.raises(Exception, match="Table 'Person' already exists"):
+        load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id")
+
+    rows = generate_rows(15)
+    rows[12]["id"] = rows[1]["id"]
+    write_sharded_tsv(table_path, [rows], HEADERS, 10)
+    # A failed replace keeps the loaded table
+    with pytest.raises(Exception, match="Loading shard"):
+        load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id", replace=True)
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM "Person"').fetchone() == (25,)
+
+    write_sharded_tsv(table_path, [generate_rows(15)], HEADERS, 10)
+    assert load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id", replace=True) == 15
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM "Person"').fetchone() == (15,)
+
+def test_load_manifest_without_shards(tmp_path):
+    table_path = str(tmp_path / "Person.tsv")
+    db_path = str(tmp_path / "person.db")
+    write_sharded_tsv(table_path, [], HEADERS, 10)
+    with pytest.raises(Exception, match="not found to read the headers"):
+        load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id")
+
+    with open(table_path, "w") as table_file:
+        table_file.write("\t".join(HEADERS) + "\n")
+    assert load_shards_into_sqlite(manifest_path(table_path), db_path, "Person", "id") == 0
+    with sqlite3.connect(db_path) as connection:
+        columns = [row[1] for row in connection.execute('PRAGMA table_info("Person")')]
+    assert columns == ["row_number"] + HEADERS
+
+def test_rewrite_removes_stale_shards(tmp_path):
+    table_path = str(tmp_path / "Person.tsv")
+    write_sharded_tsv(table_path, [generate_rows(25)], HEADERS, 10)
+    manifest_rows = write_sharded_tsv(table_path, [generate_rows(5)], HEADERS, 10)
+    assert len(manifest_rows) == 1
+    assert os.path.isfile(shard_path(table_path, 0))
+    assert not os.path.exists(shard_path(table_path, 1))
+    assert not os.path.exists(shard_path(table_path, 2))
+
+def test_remove_shards(tmp_path):
+    table_path = str(tmp_path / "Person.tsv")
+    write_sharded_tsv(table_path, [generate_rows(25)], HEADERS, 10)
+    remove_shards(table_path)
+    assert os.listdir(tmp_path) == []
+
+def test_shard_only_large_tables(tmp_path):
+    table_names = ["Person", "Small", "GenderType"]
+    schema_tables = {
+        "table": {"rows": [{"table": t, "path": str(tmp_path / f"{t}.tsv")} for t in table_names]},
+        "column": {"rows": [{"table": t, "column": c} for t in ["Person", "Small"] for c in HEADERS] +
+                           [{"table": "GenderType", "column": "permissible_value"}]},
+    }
+    data_tables = [{"table": "Person", "rows": generate_rows(25)}, {"table": "Small", "rows": generate_rows(10)},
+                   {"table": "GenderType", "rows": [{"permissible_value": f"gender {i}"} for i in range(25)]}]
+    # Leave shards of an earlier write of a table that isn't sharded anymore
+    write_sharded_tsv(str(tmp_path / "Small.tsv"), [generate_rows(25)], HEADERS, 5)
+
+    serialize_data_tables(schema_tables, data_tables, 10)
+    assert sorted(os.listdir(tmp_path)) == ["GenderType.tsv", "Person.00000.tsv", "Person.00001.tsv", "Person.00002.tsv",
+                                            "Person.manifest.tsv", "Person.tsv", "Small.tsv"]
+    with open(tmp_path / "GenderType.tsv") as table_file:
+        assert len(table_file.readlines()) == 26
@@ -0,0 +1,50 @@
+import os
+import csv
+import pytest
+
+from valve_linkml.source_reader import read_columns
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PATIENTS_PATH = os.path.join(BASE_DIR, "linkml_input", "synthea", "patients.csv")
+PATIENT_COLUMNS = ["BIRTHDATE", "FIRST", "LAST", "ADDRESS", "CITY", "ZIP"]
+
+def read_dict_columns(source_path: str, columns: list, delimiter: str = ",") -> dict:
+    with open(source_path, "r", newline="") as source_file:
+        rows = list(csv.DictReader(source_file, delimiter=delimiter))
+    return {column: [row[column] for row in rows] for column in columns}
+
+def merge_batches(batches) -> dict:
+    columns = {}
+    for batch in batches:
+        for column, values in batch.items():
+            columns.setdefault(column, []).extend(values)
+    return columns
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4096, 64 * 1024 * 1024])
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_read_columns_matches_dict_reader(chunk_size, max_workers):
+    batches = read_columns(PATIENTS_PATH, PATIENT_COLUMNS, max_workers=max_workers, chunk_size=chunk_size)
+    assert merge_batches(batches) == read_dict_columns(PATIENTS_PATH, PATIENT_COLUMNS)
+
+def test_read_columns_quoted_values(tmp_path):
+    source_path = str(tmp_path / "procedures.tsv")
+    with open(source_path, "w", newline="") as source_file:
+        source_file.write('CODE\tDESCRIPTION\r\n1\t"Procedure\tone"\r\n2\t"Say ""two"""\r\n')
+    batches = read_columns(source_path, ["DESCRIPTION", "CODE"], delimiter="\t", max_workers=2, chunk_size=1)
+    assert merge_batches(batches) == read_dict_columns(source_path, ["DESCRIPTION", "CODE"], delimiter="\t")
+
+def test_read_columns_short_row(tmp_path):
+    source_path = str(tmp_path / "patients.csv")
+    with open(source_path, "w") as source_file:
+        source_file.write("Id,FIRST,LAST\n1,José,Gómez\n2,Milo\n")
+    # Byte offset of the short row: header (14 bytes) + first row (15 bytes, "é" and "ó" are 2 bytes each)
+    for max_workers, chunk_size in [(1, 1024), (2, 1)]:
+        with pytest.raises(ValueError, match="Row at byte offset 29 of '.*patients.csv' has 2 values, but column 'LAST' is value 3"):
+            list(read_columns(source_path, ["FIRST", "LAST"], max_workers=max_workers, chunk_size=chunk_size))
+    # Short rows are fine if they have every projected column
+    assert merge_batches(read_columns(source_path, ["Id", "FIRST"])) == {"Id": ["1", "2"], "FIRST": ["José", "Milo"]}
+
+def test_read_columns_missing_column():
+    with pytest.raises(ValueError, match="Columns GENDER_IDENTITY not found"):
+        list(read_columns(PATIENTS_PATH, ["FIRST", "GENDER_IDENTITY"]))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import os
+import csv
+import logging
+from typing import List, Set, Dict, Tuple
+from argparse import ArgumentParser
+
+from linkml_runtime.utils.schemaview import SchemaView
+
+from .import_resolver import resolve_schema_view
+from .valve_schema import VALVE_SCHEMA, primary_structure, is_from_structure, from_structure2table_column, format_table_name, init_valve_table
+
+"""Usage: python3 -m valve_linkml.check_mapping <linkml-yaml-schema-path> -o <valve-output-directory>"""
+
+LOGGER = logging.getLogger("check_mapping")
+
+VALVE_METADATA_TABLE_NAMES = ["table", "column", "datatype"]
+VALVE_SAMPLE_DATATYPE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "valve_sample_schema", "datatype.tsv")
+
+def main():
+    # Print info logs, ex. import resolution time, when run from the command line
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    # CLI
+    parser = ArgumentParser()
+    parser.add_argument('yaml_schema_path', type=str, help="Path to LinkML YAML schema file")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory of mapped VALVE tables (table.tsv, column.tsv, datatype.tsv)")
+    parser.add_argument("-i", "--import-dir", help="Directory mirroring LinkML imports, ex. linkml:types => <import-dir>/linkml/types.yaml. Standard LinkML modules are bundled.")
+    parser.add_argument("--cache-dir", help="Directory to cache parsed LinkML schemas and imports in.")
+    args = parser.parse_args()
+
+    # Validate args
+    if not os.path.isdir(args.output_dir):
+        raise ValueError(f"Output directory '{args.output_dir}' does not exist.")
+
+    # Run
+    check_schema_mapping(resolve_schema_view(args.yaml_schema_path, args.import_dir, args.cache_dir, LOGGER), read_schema_tables(args.output_dir))
+    LOGGER.info(f"Mapping of '{args.yaml_schema_path}' to '{args.output_dir}' is consistent")
+
+
+def read_schema_tables(output_dir: str) -> dict:
+    """Read serialized VALVE schema tables into the same structure returned by linkml2valve"""
+    schema_tables = {}
+    for schema_table_name in VALVE_SCHEMA["tables"]:
+        schema_table_path = os.path.join(output_dir, f"{schema_table_name}.tsv")
+        with open(schema_table_path, 'r') as table_file:
+            reader = csv.DictReader(table_file, delimiter='\t')
+            schema_tables[schema_table_name] = {"rows": list(reader), "path": schema_table_path}
+    return schema_tables
+
+
+def check_schema_mapping(linkml_schema: SchemaView, mapped_schema_tables: dict):
+    """Raise an exception listing every inconsistency between a LinkML schema and its mapped VALVE schema tables"""
+    errors = find_schema_mapping_errors(linkml_schema, mapped_schema_tables)
+    if errors:
+        raise Exception(f"{len(errors)} schema mapping errors:\n" + "\n".join(errors))
+
+
+def find_schema_mapping_errors(linkml_schema: SchemaView, mapped_schema_tables: dict) -> List[str]:
+    """Check that every class, enum, slot and type is mapped, and that foreign keys resolve to exactly 1 primary key.
+    All lookups use sets or dicts, so this runs in time linear in the size of the schema and mapped tables."""
+    all_classes = linkml_schema.all_classes().values()
+    all_enums = linkml_schema.all_enums().values()
+    all_slots = linkml_schema.all_slots().values()
+    all_types = linkml_schema.all_types().values()
+
+    # Index mapped tables
+    all_table_names: Set[str] = {t["table"] for t in mapped_schema_tables["table"]["rows"]}
+    all_columns = mapped_schema_tables["column"]["rows"]
+    all_column_names: Set[str] = set()
+    all_column_table_names: Set[str] = set()
+    columns_by_table_column: Dict[Tuple[str, str], List[dict]] = {}
+    from_tables: Set[str] = set()
+    for c in all_columns:
+        all_column_names.add(c["column"])
+        all_column_table_names.add(c["table"])
+        columns_by_table_column.setdefault((c["table"], c["column"]), []).append(c)
+        if c.get("structure") and is_from_structure(c["structure"]):
+            from_tables.add(from_structure2table_column(c["structure"])[0])
+    all_datatype_names: Set[str] = {d["datatype"] for d in mapped_schema_tables["datatype"]["rows"]}
+
+    # Index schema
+    class_names: Set[str] = {c.name for c in all_classes}
+    enum_names: Set[str] = {e.name for e in all_enums}
+    slots_by_name = {s.name: s for s in all_slots}
+    # The first class that declares a slot is the one a multivalued slot gets mapped from
+    slot_classes = {}
+    class_slot_names: Set[str] = set()
+    for linkml_class in all_classes:
+        for slot_name in linkml_class.slots:
+            slot_classes.setdefault(slot_name, linkml_class)
+        class_slot_names.update(linkml_class.slots)
+        class_slot_names.update(linkml_class.attributes)
+    # Slots that only inherit "multivalued" from an ancestor slot are skipped as columns but aren't mapped as multivalued slots either
+    inherited_multivalued_slot_names: Set[str] = {s.name for s in all_slots if not s.multivalued and s.name in class_slot_names and
+                                                  any(slots_by_name[a].multivalued for a in linkml_schema.slot_ancestors(s.name) if a in slots_by_name)}
+    if inherited_multivalued_slot_names:
+        LOGGER.warning(f"Slots that inherit multivalued from an ancestor slot aren't mapped: {', '.join(sorted(inherited_multivalued_slot_names))}")
+
+    def is_datatype(slot_range: str) -> bool:
+        return slot_range not in class_names and slot_range not in enum_names
+
+    errors = []
+
+    # Every LinkML class name should be the (formatted) value of some "table" column in the Table table
+    for linkml_class in all_classes:
+        if format_table_name(linkml_class.name) not in all_table_names:
+            errors.append(f"LinkML class {linkml_class.name} not found in Table table")
+
+    # Every LinkML enum name should be the (formatted) value of some "table" column in the Table table
+    for linkml_enum in all_enums:
+        if format_table_name(linkml_enum.name) not in all_table_names:
+            errors.append(f"LinkML enum {linkml_enum.name} not found in Table table")
+
+    # Every non-multivalued LinkML slot name of a class should be the value of some "column" column in the Column table (slots without a class aren't mapped)
+    for linkml_slot in all_slots:
+        if linkml_slot.multivalued or linkml_slot.name in inherited_multivalued_slot_names: continue
+        if linkml_slot.name in class_slot_names and linkml_slot.name not in all_column_names:
+            errors.append(f"LinkML slot {linkml_slot.name} not found in Column table")
+
+    # Every LinkML type name should be the value of some "datatype" column in the Datatype table
+    for linkml_type in all_types:
+        if linkml_type.name not in all_datatype_names:
+            errors.append(f"LinkML type {linkml_type.name} not found in Datatype table")
+
+    # Every LinkML slot_usage whose range is a datatype should be the transformed value of some "datatype" column in the Datatype table, and some "datatype" column in the Column table.
+    # Slot usages of slots that the class doesn't have (ex. in a mixin without the slot) aren't mapped to a column, so they're skipped.
+    for linkml_class in all_classes:
+        for slot_name, slot_usage in linkml_class.slot_usage.items():
+            slot = slots_by_name.get(slot_name)
+            if slot_usage.multivalued or (slot is not None and slot.multivalued) or slot_name in inherited_multivalued_slot_names: continue
+            if not is_datatype(slot_usage.range): continue
+            slot_usage_columns = columns_by_table_column.get((format_table_name(linkml_class.name), slot_name), [])
+            if not slot_usage_columns: continue
+            slot_usage_datatype = f"{linkml_class.name.lower()}_{slot_name}"
+            if slot_usage_datatype not in all_datatype_names:
+                errors.append(f"LinkML slot_usage {linkml_class.name}.{slot_name} not found as datatype '{slot_usage_datatype}' in Datatype table")
+            if not any(c["datatype"] == slot_usage_datatype for c in slot_usage_columns):
+                errors.append(f"LinkML slot_usage {linkml_class.name}.{slot_name} not found as a Column table row with datatype '{slot_usage_datatype}'")
+
+    for linkml_slot in all_slots:
+        # Enum ranges map to enum foreign keys from slots, and multivalued enum slots are treated as datatypes
+        if linkml_slot.range not in class_names: continue
+        range_table_name = format_table_name(linkml_slot.range)
+        if linkml_slot.multivalued:
+            # Every LinkML multivalued slot range, that isn't a datatype, should be the transformed value of some foreign key "structure" in the Column table
+            slot_class = slot_classes.get(linkml_slot.name)
+            if slot_class is None: continue
+            multivalued_columns = columns_by_table_column.get((range_table_name, slot_class.name.lower()), [])
+            if not any(c.get("structure") and is_from_structure(c["structure"]) for c in multivalued_columns):
+                errors.append(f"LinkML multivalued slot {slot_class.name}.{linkml_slot.name} not found as foreign key column {range_table_name}.{slot_class.name.lower()} in Column table")
+        elif linkml_slot.name in class_slot_names and linkml_slot.name not in inherited_multivalued_slot_names and not (linkml_slot.identifier or linkml_slot.key):
+            # Every LinkML slot range that is a LinkML class should be the transformed value of some foreign key "structure" in the Column table
+            if range_table_name not in from_tables:
+                errors.append(f"LinkML slot {linkml_slot.name} range {linkml_slot.range} not found in any foreign key 'structure' in Column table")
+
+    # Table table should include VALVE metadata rows
+    for table_name in VALVE_METADATA_TABLE_NAMES:
+        if table_name not in all_table_names:
+            errors.append(f"VALVE metadata table '{table_name}' not found in Table table")
+
+        # Column table should include VALVE metadata rows (Each valve metadata table name is the value of some "table" column in the Column table)
+        if table_name not in all_column_table_names:
+            errors.append(f"VALVE metadata '{table_name}' columns not found in Column table")
+
+    # Datatype table should include VALVE metadata rows
+    if not os.path.exists(VALVE_SAMPLE_DATATYPE_PATH):
+        LOGGER.warning(f"Skipped checking VALVE metadata datatypes because '{VALVE_SAMPLE_DATATYPE_PATH}' does not exist")
+    else:
+        for valve_datatype in init_valve_table(VALVE_SAMPLE_DATATYPE_PATH, None):
+            if valve_datatype["datatype"] not in all_datatype_names:
+                errors.append(f"VALVE metadata datatype '{valve_datatype['datatype']}' not found in Datatype table")
+
+    # If a Column table row has a foreign key "structure", then that should correspond to exactly 1 other Column table row whose "structure" is a primary key
+    for column in all_columns:
+        if column.get("structure") and is_from_structure(column["structure"]):
+            fk_table_name, fk_column_name = from_structure2table_column(column["structure"])
+            matching_fk_columns = columns_by_table_column.get((fk_table_name, fk_column_name), [])
+            if not len(matching_fk_columns):
+                errors.append(f"No Column table row found corresponding to foreign key 'structure' {column['structure']}")
+                continue
+            if len(matching_fk_columns) > 1:
+                errors.append(f"More than 1 Column table row found corresponding to foreign key 'structure' {column['structure']}")
+                continue
+            fk_column = matching_fk_columns[0]
+            if not fk_column["structure"] == primary_structure():
+                errors.append(f"Column table row {fk_column['table']}.{fk_column['column']} corresponding to foreign key 'structure' {column['structure']} does not have primary key 'structure'")
+
+    return errors
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,41 @@
 #!/usr/bin/env python3
 import os
 import csv
-from typing import List
+import random
+from typing import List, Optional
 
-from .generate_from_synthea import generate_tables_from_fhir_mapping
+from .generate_from_synthea import generate_tables_from_fhir_mapping, SYNTHEA_ERROR_CONFIG
+from .error_injection import inject_errors_in_batches
+from .sharding import write_sharded_tsv, remove_shards
 
 def is_enum_table(table_name, enum_primary_key, column_dicts):
     """Determine if a table is an enum table based on its name and column dicts."""
     # Enum tables have a single column with the same name as the table
     return any(c for c in column_dicts if c["table"] == table_name and c["column"] == enum_primary_key)
 
-def generate_schema_data(data_table_dicts: List[dict], data_column_dicts: List[dict], logger):
-    """Generate data given some data table and column dicts. Exclude Enum tables. Don't use this with VALVE config metadata."""
+def uses_fhir_mapping(data_table_dicts: List[dict]) -> bool:
+    """Whether the data tables get pre-generated data mapped from Synthea"""
+    table_names = [t["table"] for t in data_table_dicts]
+    return "Person" in table_names and "Address" in table_names
+
+def default_error_config(data_table_dicts: List[dict]) -> List[dict]:
+    """Errors added to generated data when no error config is given"""
+    return SYNTHEA_ERROR_CONFIG if uses_fhir_mapping(data_table_dicts) else []
+
+def generate_schema_data(data_table_dicts: List[dict], data_column_dicts: List[dict], logger,
+                         error_config: Optional[List[dict]] = None, seed: Optional[int] = None, shard_size: Optional[int] = None):
+    """Generate data given some data table and column dicts. Exclude Enum tables. Don't use this with VALVE config metadata.
+    Errors are injected according to the error config, which defaults to default_error_config(). Validate the config first with validate_error_config().
+    The seed makes both the generated data and the errors reproducible.
+    If a shard size is given, tables with more rows than that are written to TSV shards with a manifest instead of the table TSV."""
     logger.info("Generating data tables...")
 
     # Map some pre-generated data to our data tables if we have the right kind
-    table_names = [t["table"] for t in data_table_dicts]
     pregenerated_table_data:dict = None
-    if "Person" in table_names and "Address" in table_names:
-        pregenerated_table_data = generate_tables_from_fhir_mapping(logger)
+    if uses_fhir_mapping(data_table_dicts):
+        pregenerated_table_data = generate_tables_from_fhir_mapping(logger, random.Random(seed))
+    if error_config is None:
+        error_config = default_error_config(data_table_dicts)
 
     # Create the data tables themselves
     for table_dict in data_table_dicts:
@@ -45,8 +62,18 @@ def generate_schema_data(data_table_dicts: List[dict], data_column_dicts: List[d
             if pregenerated_table_data is not None:
                 matching_generated_data = pregenerated_table_data.get(table_name) # case-sensitive
                 if matching_generated_data is not None:
-                    # Write generated data to the table
-                    writer.writerows(matching_generated_data)
+                    # Add errors to the generated data and write it to the table
+                    error_counts = {}
+                    batches = inject_errors_in_batches([matching_generated_data], table_name, error_config, seed, error_counts)
+                    if shard_size and len(matching_generated_data) > shard_size:
+                        # The table TSV keeps only its headers, and the rows go to shards listed in a manifest
+                        write_sharded_tsv(table_path, batches, table_column_names, shard_size)
+                    else:
+                        remove_shards(table_path)
+                        for batch in batches:
+                            writer.writerows(batch)
+                    for (column, error_type), error_count in error_counts.items():
+                        logger.info(f"Added {error_count} '{error_type}' errors to {table_name}.{column}")
 
             
                     
@@ -0,0 +1,162 @@
+import re
+import csv
+from fractions import Fraction
+from typing import List, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .valve_schema import primary_structure, is_from_structure
+
+"""Inject known numbers of errors into data tables, ex. for VALVE validation benchmarks.
+An error config is a list of dicts, one per corrupted column: {"table": "Person", "column": "primary_email", "type": "regex", "rate": 0.01}"""
+
+# Error types
+REGEX_ERROR = "regex" # value doesn't match the column datatype's condition
+FOREIGN_KEY_ERROR = "foreign_key" # value isn't in the table referenced by the column's from() structure
+REQUIRED_ERROR = "required" # value is missing from a required column
+PRIMARY_KEY_ERROR = "primary_key" # value duplicates the primary key of another row
+ERROR_TYPES = [REGEX_ERROR, FOREIGN_KEY_ERROR, REQUIRED_ERROR, PRIMARY_KEY_ERROR]
+
+INVALID_VALUE = "invalid-example"
+
+ERROR_CONFIG_HEADERS = ["table", "column", "type", "rate"]
+
+
+def read_error_config(tsv_path: str) -> List[dict]:
+    """Read an error config from a TSV with the columns: table, column, type, rate"""
+    with open(tsv_path, 'r') as config_file:
+        reader = csv.DictReader(config_file, delimiter='\t')
+        missing_headers = [h for h in ERROR_CONFIG_HEADERS if h not in (reader.fieldnames or [])]
+        if missing_headers:
+            raise ValueError(f"Error config '{tsv_path}' is missing the columns: {', '.join(missing_headers)}")
+        return [dict(row, rate=float(row["rate"])) for row in reader]
+
+
+def validate_error_config(error_config: List[dict], column_dicts: List[dict], datatype_dicts: List[dict]) -> List[dict]:
+    """Check that every error in the config would be a real VALVE error in the mapped Column and Datatype tables:
+    the column exists, a regex error violates a condition of the column's datatype (or its parents), a required error is on a required column,
+    a foreign key error is on a from() column, and a primary key error is on a primary column."""
+    columns = {(c["table"], c["column"]): c for c in column_dicts}
+    datatypes = {d["datatype"]: d for d in datatype_dicts}
+    configured_errors = set()
+    column_rates = {}
+    for error_spec in error_config:
+        error_name = f"'{error_spec['type']}' error for {error_spec['table']}.{error_spec['column']}"
+        if error_spec["type"] not in ERROR_TYPES:
+            raise ValueError(f"Error type of {error_name} must be one of: {', '.join(ERROR_TYPES)}")
+        if not 0 <= error_spec["rate"] < 1:
+            raise ValueError(f"Error rate {error_spec['rate']} of {error_name} must be in [0, 1)")
+        error_key = (error_spec["table"], error_spec["column"], error_spec["type"])
+        if error_key in configured_errors:
+            raise ValueError(f"{error_name} is configured more than once")
+        configured_errors.add(error_key)
+        # Errors of the same column are added to different rows, so their rates can't add up to every row
+        column_key = (error_spec["table"], error_spec["column"])
+        column_rates[column_key] = column_rates.get(column_key, 0) + Fraction(str(error_spec["rate"]))
+        if column_rates[column_key] >= 1:
+            raise ValueError(f"Error rates of {error_spec['table']}.{error_spec['column']} add up to {float(column_rates[column_key])}, which must be less than 1")
+
+        column = columns.get((error_spec["table"], error_spec["column"]))
+        if column is None:
+            raise ValueError(f"Column of {error_name} not found in Column table")
+        structure = column.get("structure") or ""
+        if error_spec["type"] == REGEX_ERROR and not is_condition_violated(column["datatype"], datatypes):
+            raise ValueError(f"{error_name} isn't an error because no condition of datatype '{column['datatype']}' rejects '{INVALID_VALUE}'")
+        if error_spec["type"] == REQUIRED_ERROR and column.get("nulltype"):
+            raise ValueError(f"{error_name} isn't an error because the column has nulltype '{column['nulltype']}'")
+        if error_spec["type"] == FOREIGN_KEY_ERROR and not is_from_structure(structure):
+            raise ValueError(f"{error_name} isn't an error because the column has no from() structure")
+        if error_spec["type"] == PRIMARY_KEY_ERROR and structure != primary_structure():
+            raise ValueError(f"{error_name} isn't an error because the column isn't a primary key")
+    return error_config
+
+
+def is_condition_violated(datatype_name: str, datatypes: dict) -> bool:
+    """Whether INVALID_VALUE fails the condition of a datatype or one of its parents"""
+    visited = set()
+    while datatype_name and datatype_name in datatypes and datatype_name not in visited:
+        visited.add(datatype_name)
+        datatype = datatypes[datatype_name]
+        condition = datatype.get("condition") or ""
+        condition_match = re.fullmatch(r"(match|search|exclude)\(/(.*)/\)", condition)
+        if condition_match:
+            condition_type, regex = condition_match.groups()
+            found = re.search(regex, INVALID_VALUE) is not None
+            if found == (condition_type == "exclude"):
+                return True
+        elif condition.startswith("in(") and f"'{INVALID_VALUE}'" not in condition and f'"{INVALID_VALUE}"' not in condition:
+            return True
+        datatype_name = datatype.get("parent")
+    return False
+
+
+def get_error_count(first_row: int, row_count: int, error_rate: float, injected_count: int) -> int:
+    """Number of errors for rows [first_row, first_row + row_count) of a stream, so the stream gets exactly floor(total rows * rate) errors"""
+    return int(Fraction(str(error_rate)) * (first_row + row_count)) - injected_count
+
+
+def select_error_rows(row_count: int, error_count: int, rng: np.random.Generator) -> np.ndarray:
+    """Select error_count distinct row indices, in random order"""
+    return rng.choice(row_count, size=error_count, replace=False)
+
+
+def inject_errors(rows: List[dict], table_name: str, error_config: List[dict], rng: np.random.Generator, error_counts: Optional[dict] = None,
+                  first_row: int = 0) -> dict:
+    """Corrupt rows of a table in place according to the error config. The rows start at first_row of the table,
+    and error_counts holds the errors already added to earlier rows. Returns the number of corrupted rows per (column, type).
+    Errors of the same column are added to different rows, and primary keys are only copied from rows without errors in that column,
+    so every counted error is in the output."""
+    error_counts = {} if error_counts is None else error_counts
+    row_count = len(rows)
+    column_error_specs = {}
+    for error_spec in error_config:
+        if error_spec["table"] == table_name:
+            column_error_specs.setdefault(error_spec["column"], []).append(error_spec)
+
+    for column, error_specs in column_error_specs.items():
+        # Keep one row to copy a primary key from. The missing errors are added to a later batch.
+        available_count = row_count - 1 if any(e["type"] == PRIMARY_KEY_ERROR for e in error_specs) else row_count
+        spec_error_counts = []
+        for error_spec in error_specs:
+            injected_count = error_counts.get((column, error_spec["type"]), 0)
+            error_count = max(0, min(get_error_count(first_row, row_count, error_spec["rate"], injected_count), available_count))
+            available_count -= error_count
+            spec_error_counts.append(error_count)
+
+        # Split one selection of rows between the errors of the column, so they never overwrite each other
+        column_error_rows = select_error_rows(row_count, sum(spec_error_counts), rng)
+        source_candidates = np.ones(row_count, dtype=bool)
+        source_candidates[column_error_rows] = False
+        source_candidates = np.flatnonzero(source_candidates)
+        spec_starts = np.cumsum([0] + spec_error_counts)
+        for error_spec, start, end in zip(error_specs, spec_starts[:-1], spec_starts[1:]):
+            error_type = error_spec["type"]
+            error_rows = np.sort(column_error_rows[start:end])
+            if error_type == PRIMARY_KEY_ERROR:
+                # Copy primary keys from rows that aren't corrupted, so every corrupted row is a duplicate
+                source_rows = source_candidates[rng.integers(0, len(source_candidates), size=len(error_rows))]
+                error_values = [rows[i][column] for i in source_rows.tolist()]
+            elif error_type == REQUIRED_ERROR:
+                error_values = [None] * len(error_rows)
+            else:
+                error_values = [INVALID_VALUE] * len(error_rows)
+
+            for i, error_value in zip(error_rows.tolist(), error_values):
+                rows[i][column] = error_value
+
+            error_counts[(column, error_type)] = error_counts.get((column, error_type), 0) + len(error_rows)
+    return error_counts
+
+
+def inject_errors_in_batches(batches: Iterable[List[dict]], table_name: str, error_config: List[dict], seed: Optional[int] = None,
+                             error_counts: Optional[dict] = None) -> Iterator[List[dict]]:
+    """Corrupt a stream of row batches of a table. Error counts are allocated over the whole stream, so it gets floor(rows * rate) errors
+    per configured column however it's split into batches. Each batch gets its own generator derived from the seed and the batch index,
+    so the same seed and batches always produce the same errors. Corrupted row counts are accumulated into error_counts."""
+    error_counts = {} if error_counts is None else error_counts
+    first_row = 0
+    for batch_index, rows in enumerate(batches):
+        rng = np.random.default_rng(None if seed is None else [seed, batch_index])
+        inject_errors(rows, table_name, error_config, rng, error_counts, first_row)
+        first_row += len(rows)
+        yield rows
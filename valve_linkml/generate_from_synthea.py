@@ -1,113 +1,112 @@
-import csv
 import random
 from datetime import date, datetime
 from logging import Logger
 
-from .utils import generate_error_set
-
-def generate_tables_from_fhir_mapping(logger: Logger) -> dict:
-    # Read the pre-generated data
+from .error_injection import REGEX_ERROR, FOREIGN_KEY_ERROR, PRIMARY_KEY_ERROR
+from .source_reader import read_columns
+
+# Source columns used by the mappings
+PATIENT_COLUMNS = ["BIRTHDATE", "FIRST", "LAST", "ADDRESS", "CITY", "ZIP"]
+ENCOUNTER_COLUMNS = ["START", "STOP"]
+PROCEDURE_COLUMNS = ["CODE", "DESCRIPTION"]
+
+# Errors to add to the mapped tables by default
+SYNTHEA_ERROR_CONFIG = [
+    {"table": "Person", "column": "gender", "type": FOREIGN_KEY_ERROR, "rate": 0.01},
+    {"table": "Person", "column": "primary_email", "type": REGEX_ERROR, "rate": 0.01},
+    {"table": "Address", "column": "id", "type": PRIMARY_KEY_ERROR, "rate": 0.005},
+    {"table": "MedicalEvent", "column": "procedure", "type": FOREIGN_KEY_ERROR, "rate": 0.0001},
+]
+
+def generate_tables_from_fhir_mapping(logger: Logger, rng: random.Random = random) -> dict:
+    """Map Synthea CSVs to personinfo tables. Pass a seeded random.Random to make the random links between tables reproducible."""
+    # Read the pre-generated data, projecting only the columns used by the mappings below
     TEST_PATIENT_DATA_FILE_PATH = "test/linkml_input/synthea/patients.csv"
     TEST_ENCOUNTER_DATA_FILE_PATH = "test/linkml_input/synthea/encounters.csv"
     TEST_PROCEDURE_DATA_FILE_PATH = "test/linkml_input/synthea/procedures.csv"
-    with open(TEST_PATIENT_DATA_FILE_PATH, "r") as patients_file, open(TEST_ENCOUNTER_DATA_FILE_PATH, "r") as encounters_file, open(TEST_PROCEDURE_DATA_FILE_PATH, "r") as procedures_file:
-        patients = csv.DictReader(patients_file, delimiter=",")
-        encounters = csv.DictReader(encounters_file, delimiter=",")
-        procedures = csv.DictReader(procedures_file, delimiter=",")
-
-        # Add some errors to some of the data
-        person_error_set = generate_error_set(sum(1 for row in patients), 0.01)
-        address_error_set = person_error_set[:len(person_error_set)//2]
-
-        medicalevent_error_set = generate_error_set(sum(1 for row in encounters), 0.0001)
-        logger.info(f"Adding {len(person_error_set)} errors to Person table")
-        logger.info(f"Adding {len(address_error_set)} errors to Address table")
-        logger.info(f"Adding {len(medicalevent_error_set)} errors to MedicalEvent table")
-        # Reset to beginning of files after counting rows
-        patients_file.seek(0)
-        encounters_file.seek(0)
-
-        person_dicts = []
-        address_dicts = []
-        medicalevents_dicts = []
-        procedure_dicts = []
-
-        for index, patient in enumerate(patients):
-            if index == 0: continue # skip header row because we've enumerated it
-            person_address = map_fhir_patient2address(patient, index)            
-            person = map_fhir_patient2person(patient, index, person_address)
-            if index in person_error_set:
-                person["gender"] = "invalid-example"
-                person["primary_email"] = "invalid-example.net"
-
-            if index in address_error_set:
-                person_address["id"] = "invalid-example"
-
+    patients = read_columns(TEST_PATIENT_DATA_FILE_PATH, PATIENT_COLUMNS)
+    encounters = read_columns(TEST_ENCOUNTER_DATA_FILE_PATH, ENCOUNTER_COLUMNS)
+    procedures = read_columns(TEST_PROCEDURE_DATA_FILE_PATH, PROCEDURE_COLUMNS)
+
+    person_dicts = []
+    address_dicts = []
+    medicalevents_dicts = []
+    procedure_dicts = []
+
+    # Map straight from the column-oriented batches, without building a dict per source row
+    index = 0
+    for batch in patients:
+        for birth_date, first, last, street, city, postal_code in zip(*(batch[c] for c in PATIENT_COLUMNS)):
+            index += 1
+            person_address = map_fhir_patient2address(street, city, postal_code, index)
+            person = map_fhir_patient2person(birth_date, first, last, index, person_address)
             person_dicts.append(person)
             address_dicts.append(person_address)
 
-        unique_procedures = list({procedure["CODE"]: procedure for procedure in procedures}.values())
-        for index, procedure in enumerate(unique_procedures):
-            if index == 0: continue # skip header row 
-            procedure_dicts.append(map_fhir_procedure2procedure_concept(procedure, index))
-
-        for index, event in enumerate(encounters):
-            if index == 0: continue # skip header row
-            procedure = random.choice(procedure_dicts)
-            medicalevent_person = random.choice(person_dicts) # this information was lost because we removed "has_medical_history" from Person, so just pick randomly
-            medicalevent = map_fhir_encounter2medical_event(event, index, procedure["id"], medicalevent_person["id"])
-            if index in medicalevent_error_set:
-                medicalevent["procedure"] = "invalid-example"
+    # Keep the first position and the last description of each procedure code
+    unique_procedures = {}
+    for batch in procedures:
+        unique_procedures.update(zip(batch["CODE"], batch["DESCRIPTION"]))
+    for index, (code, description) in enumerate(unique_procedures.items(), start=1):
+        procedure_dicts.append(map_fhir_procedure2procedure_concept(code, description, index))
+
+    index = 0
+    for batch in encounters:
+        for start, stop in zip(batch["START"], batch["STOP"]):
+            index += 1
+            procedure = rng.choice(procedure_dicts)
+            medicalevent_person = rng.choice(person_dicts) # this information was lost because we removed "has_medical_history" from Person, so just pick randomly
+            medicalevent = map_fhir_encounter2medical_event(start, stop, index, procedure["id"], medicalevent_person["id"])
             medicalevents_dicts.append(medicalevent)
 
-        return {"Person":person_dicts, "Address":address_dicts, "MedicalEvent": medicalevents_dicts, "ProcedureConcept": procedure_dicts}
+    return {"Person":person_dicts, "Address":address_dicts, "MedicalEvent": medicalevents_dicts, "ProcedureConcept": procedure_dicts}
     
 
-def map_fhir_patient2person(fhir_patient: dict, index: str, person_address: dict):
+def map_fhir_patient2person(birth_date: str, first: str, last: str, index: int, person_address: dict):
     """Depends on a mapped person address id because of foreign key"""
     # person_columns = ['Id', 'BIRTHDATE', 'FIRST', 'LAST', 'GENDER']
     # aliases	id	name	description	image	primary_email	birth_date	age_in_years	gender	current_address	has_employment_history	has_familial_relationships	has_medical_history
     return {
         "id": index, # generated int ID instead of using uuid for performance
-        "birth_date": fhir_patient["BIRTHDATE"],
-        "age_in_years": calculate_age(datetime.strptime(fhir_patient["BIRTHDATE"], "%Y-%m-%d")),
-        "name": f'{fhir_patient["FIRST"]} {fhir_patient["LAST"]}',
-        "primary_email": f'{fhir_patient["FIRST"][0]}.{fhir_patient["LAST"]}@example.com',
+        "birth_date": birth_date,
+        "age_in_years": calculate_age(datetime.strptime(birth_date, "%Y-%m-%d")),
+        "name": f'{first} {last}',
+        "primary_email": f'{first[0]}.{last}@example.com',
         # TODO update using fk
         # "gender": random.choice(['cisgender woman', 'nonbinary woman', 'transgender woman']) if (fhir_patient["GENDER"] == "F") else random.choice(['cisgender man', 'nonbinary man', 'transgender man']),
         "current_address": person_address["id"] # foreign key
     }
 
-def map_fhir_patient2address(fhir_patient: dict, index: str):
+def map_fhir_patient2address(street: str, city: str, postal_code: str, index: int):
     # address_columns = ['ADDRESS', 'CITY', 'STATE', 'ZIP']
     # street	city	postal_code
     return {
-        "street": fhir_patient["ADDRESS"],
-        "city": fhir_patient["CITY"],
-        "postal_code": fhir_patient["ZIP"],
+        "street": street,
+        "city": city,
+        "postal_code": postal_code,
         "id": index # generated ID
     }
 
-def map_fhir_encounter2medical_event(fhir_encounter: dict, index: str, procedure_fk: str, person_fk: str):
+def map_fhir_encounter2medical_event(start: str, stop: str, index: int, procedure_fk: str, person_fk: str):
     # Id, START, STOP, PATIENT, ORGANIZATION, PROVIDER, PAYER, ENCOUNTERCLASS, CODE, DESCRIPTION, BASE_ENCOUNTER_COST, TOTAL_CLAIM_COST, PAYER_COVERAGE, REASONCODE, REASONDESCRIPTION
     # started_at_time	ended_at_time	duration	is_current	in_location	diagnosis	procedure
     return {
-        "started_at_time": fhir_encounter["START"],
-        "ended_at_time": fhir_encounter["STOP"],
-        "duration": (datetime.strptime(fhir_encounter["STOP"], "%Y-%m-%dT%H:%M:%SZ") - datetime.strptime(fhir_encounter["START"], "%Y-%m-%dT%H:%M:%SZ")).total_seconds() / 60,
+        "started_at_time": start,
+        "ended_at_time": stop,
+        "duration": (datetime.strptime(stop, "%Y-%m-%dT%H:%M:%SZ") - datetime.strptime(start, "%Y-%m-%dT%H:%M:%SZ")).total_seconds() / 60,
         "procedure": procedure_fk,
         "id": index, # generated ID
         # Add a link to person id as part of multivalued mapping. Just use random for now
         "person": person_fk
     }
 
-def map_fhir_procedure2procedure_concept(fhir_procedure: dict, index: str):
+def map_fhir_procedure2procedure_concept(code: str, description: str, index: int):
     # DATE,PATIENT,ENCOUNTER,CODE,DESCRIPTION,BASE_COST,REASONCODE,REASONDESCRIPTION
     # id	name	description	image
     return {
         "id": index, # generated ID, use index instead of procedure code for faster loading
-        "name": fhir_procedure["CODE"],
-        "description": fhir_procedure["DESCRIPTION"],
+        "name": code,
+        "description": description,
     }
 
 
@@ -0,0 +1,102 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+from logging import Logger
+from typing import Dict, Optional
+
+import linkml_runtime
+from linkml_runtime.loaders import yaml_loader
+from linkml_runtime.linkml_model.meta import SchemaDefinition
+from linkml_runtime.utils.schemaview import SchemaView
+
+LOGGER = logging.getLogger("import_resolver")
+
+LINKML_PREFIX = "linkml"
+
+
+def resolve_schema_view(yaml_schema_path: str, import_dir: Optional[str] = None, cache_dir: Optional[str] = None, logger: Logger = LOGGER) -> SchemaView:
+    """Load a LinkML schema and its imports closure from local files only, and return a SchemaView with every import already resolved.
+    Imports are looked up in the import (mirror) directory, then relative to the importing schema, then in the LinkML modules bundled with linkml_runtime.
+    Parsed schemas are cached in the cache directory, keyed by the hash of their content. The time spent resolving imports is logged separately."""
+    schema = load_schema(yaml_schema_path, cache_dir)
+    start_time = time.perf_counter()
+    schema_map = resolve_imports(schema, os.path.dirname(os.path.abspath(yaml_schema_path)), import_dir, cache_dir)
+    logger.info(f"Resolved {len(schema_map)} imports of '{yaml_schema_path}' in {time.perf_counter() - start_time:.3f}s")
+
+    # SchemaView only loads imports that are missing from its schema map, so it will never go to the network
+    schema_view = SchemaView(schema)
+    schema_view.schema_map.update(schema_map)
+    return schema_view
+
+
+def resolve_imports(schema: SchemaDefinition, schema_dir: str, import_dir: Optional[str], cache_dir: Optional[str]) -> Dict[str, SchemaDefinition]:
+    """Map every import in the imports closure of a schema to its parsed schema.
+    SchemaView looks imports up by name, so the same import name must resolve to the same file everywhere in the closure."""
+    schema_map = {}
+    import_paths = {}
+    todo = [(imp, schema_dir) for imp in schema.imports]
+    while todo:
+        imp, importing_dir = todo.pop()
+        import_path = find_import_path(imp, importing_dir, import_dir)
+        if import_path is None:
+            raise Exception(f"Error: Import '{imp}' could not be resolved offline. Add it to the import directory '{import_dir}'.")
+        import_path = os.path.abspath(import_path)
+        if imp in import_paths:
+            if import_paths[imp] != import_path:
+                raise Exception(f"Error: Import '{imp}' resolves to both '{import_paths[imp]}' and '{import_path}'. Rename one of them.")
+            continue
+        imported_schema = load_schema(import_path, cache_dir)
+        import_paths[imp] = import_path
+        schema_map[imp] = imported_schema
+        LOGGER.debug(f"Resolved import '{imp}' to '{import_path}'")
+        todo += [(i, os.path.dirname(import_path)) for i in imported_schema.imports]
+    return schema_map
+
+
+def find_import_path(imp: str, importing_dir: str, import_dir: Optional[str]) -> Optional[str]:
+    """Find the local YAML file of an import, ex. "linkml:types" => "<import_dir>/linkml/types.yaml" """
+    prefix, _, name = imp.rpartition(":")
+    candidate_paths = []
+    if import_dir is not None:
+        candidate_paths.append(os.path.join(import_dir, prefix, name) if prefix else os.path.join(import_dir, name))
+    if not prefix:
+        candidate_paths.append(os.path.join(importing_dir, name))
+    if prefix == LINKML_PREFIX:
+        candidate_paths.append(os.path.join(str(linkml_runtime.SCHEMA_DIRECTORY), name))
+    return next((f"{p}.yaml" for p in candidate_paths if os.path.isfile(f"{p}.yaml")), None)
+
+
+def load_schema(yaml_schema_path: str, cache_dir: Optional[str] = None) -> SchemaDefinition:
+    """Parse a LinkML YAML schema file, or load it from the cache if its content has been parsed before"""
+    with open(yaml_schema_path, "rb") as schema_file:
+        content = schema_file.read()
+    if cache_dir is None:
+        return parse_schema(content, yaml_schema_path)
+
+    # Include the linkml_runtime version in the key, since pickled schemas depend on its classes
+    content_hash = hashlib.sha256(content + linkml_runtime.__version__.encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{content_hash}.pickle")
+    if os.path.isfile(cache_path):
+        with open(cache_path, "rb") as cache_file:
+            schema = pickle.load(cache_file)
+        # The same content may have been cached from another path
+        schema.source_file = yaml_schema_path
+        return schema
+
+    schema = parse_schema(content, yaml_schema_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so concurrent conversions never read a partial cache file
+    temp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_cache_path, "wb") as cache_file:
+        pickle.dump(schema, cache_file)
+    os.replace(temp_cache_path, cache_path)
+    LOGGER.debug(f"Cached parsed schema '{yaml_schema_path}' to '{cache_path}'")
+    return schema
+
+
+def parse_schema(content: bytes, yaml_schema_path: str) -> SchemaDefinition:
+    schema = yaml_loader.load(content.decode(), target_class=SchemaDefinition, base_dir=os.path.dirname(os.path.abspath(yaml_schema_path)))
+    schema.source_file = yaml_schema_path
+    return schema
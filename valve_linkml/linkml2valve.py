@@ -8,7 +8,11 @@ from linkml_runtime.utils.schemaview import SchemaView, SlotDefinition, ClassDef
 
 from .valve_schema import VALVE_SCHEMA, table_row, column_row, datatype_row, primary_structure, from_structure, format_table_name, prepend_valve_tables
 from .utils import write_dicts2tsv
-from .data_generator import generate_schema_data
+from .data_generator import generate_schema_data, default_error_config, is_enum_table
+from .check_mapping import check_schema_mapping
+from .import_resolver import resolve_schema_view
+from .error_injection import read_error_config, validate_error_config
+from .sharding import write_sharded_tsv, remove_shards
 
 """Usage: python3 -m valve_linkml.linkml2valve <linkml-yaml-schema-path> -d <linkml-yaml-data-directory>"""
 
@@ -27,6 +31,9 @@ ENUM_MEANING_DATATYPE = "CURIE"
 SCHEMA_DEFAULT_RANGE = DEFAULT_DATATYPE
 
 def main():
+    # Print info logs, ex. import resolution time, when run from the command line
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
     # CLI
     parser = ArgumentParser()
     parser.add_argument('yaml_schema_path', type=str, help="Path to LinkML YAML schema file")
@@ -34,6 +41,12 @@ def main():
     parser.add_argument("-d", "--data-dir", help="Directory of LinkML YAML data files. These are NOT schemas!")
     parser.add_argument("-g", "--generate-data", help="Boolean option to generate data files from the schema.")
     parser.add_argument("-v", "--verbose", help="Boolean option log verbosely.")
+    parser.add_argument("-c", "--check-mapping", help="Boolean option to check the consistency of the mapped VALVE tables before writing them.")
+    parser.add_argument("-i", "--import-dir", help="Directory mirroring LinkML imports, ex. linkml:types => <import-dir>/linkml/types.yaml. Standard LinkML modules are bundled.")
+    parser.add_argument("--cache-dir", help="Directory to cache parsed LinkML schemas and imports in.")
+    parser.add_argument("-e", "--error-config", help="Path to a TSV of errors to add to generated data, with columns: table, column, type, rate")
+    parser.add_argument("-s", "--seed", type=int, help="Random seed for adding errors to generated data.")
+    parser.add_argument("--shard-size", type=int, help="Write data tables as TSV shards of this many rows, with a manifest per table.")
     args = parser.parse_args()
 
     # Validate args
@@ -42,35 +55,55 @@ def main():
         raise ValueError(f"Output directory '{args.output_dir}' does not exist.")
 
     # Run
-    linkml2valve(args.yaml_schema_path, args.output_dir, args.data_dir, args.generate_data, args.verbose)
+    linkml2valve(args.yaml_schema_path, args.output_dir, args.data_dir, args.generate_data, args.verbose, args.check_mapping,
+                 args.import_dir, args.cache_dir, args.error_config, args.seed,
+                 args.shard_size)
 
 
-def linkml2valve(yaml_schema_path: str, output_dir: str, data_dir: str = None, generate_data: bool = False, log_verbosely: bool = False):
+def linkml2valve(yaml_schema_path: str, output_dir: str, data_dir: str = None, generate_data: bool = False, log_verbosely: bool = False,
+                 check_mapping: bool = False, import_dir: str = None, cache_dir: str = None,
+                 error_config_path: str = None, seed: int = None, shard_size: int = None):
     if log_verbosely:
         LOGGER.setLevel(level=logging.DEBUG)
 
     # Map LinkML schema to VALVE tables
-    mapped_valve_schema: dict = map_schema(yaml_schema_path, output_dir)
+    mapped_valve_schema: dict = map_schema(yaml_schema_path, output_dir, import_dir, cache_dir)
     schema_tables = mapped_valve_schema["schema_tables"]
 
-    # Write data table TSVs (without VALVE metadata rows)
-    serialize_data_tables(schema_tables, mapped_valve_schema["data_tables"])
+    # Prepend VALVE metadata rows to a copy of the mapped schema tables. The data tables are written from the mapped rows only.
+    valve_schema_tables = prepend_valve_tables({name: dict(table) for name, table in schema_tables.items()}, output_dir, LOGGER)
 
-    # Create the data table files with some generated data (exclude VALVE metadata rows by not adding them yet, and Enum tables)
+    # Check the mapping against the LinkML schema before writing anything, so a failing check leaves no partial output
+    if check_mapping:
+        check_schema_mapping(mapped_valve_schema["linkml_schema"], valve_schema_tables)
+        LOGGER.debug(f"Checked mapping of '{yaml_schema_path}'")
+    # Validate the errors to add to generated data, including the default ones, before writing anything
+    error_config = None
     if generate_data:
-        generate_schema_data(schema_tables["table"]["rows"], schema_tables["column"]["rows"], LOGGER)
+        error_config = read_error_config(error_config_path) if error_config_path else default_error_config(schema_tables["table"]["rows"])
+        validate_error_config(error_config, schema_tables["column"]["rows"], valve_schema_tables["datatype"]["rows"])
 
-    # Prepend VALVE metadata rows to mapped schema tables
-    schema_tables = prepend_valve_tables(schema_tables, output_dir, LOGGER)
+    # Data tables go in a subdirectory of the schema directory by default
+    data_table_dir = os.path.join(output_dir, "data")
+    if not os.path.isdir(data_table_dir):
+        os.mkdir(data_table_dir)
+        LOGGER.info(f"Created data directory '{data_table_dir}'")
+
+    # Write data table TSVs (without VALVE metadata rows)
+    serialize_data_tables(schema_tables, mapped_valve_schema["data_tables"], shard_size)
+
+    # Create the data table files with some generated data (exclude VALVE metadata rows, and Enum tables)
+    if generate_data:
+        generate_schema_data(schema_tables["table"]["rows"], schema_tables["column"]["rows"], LOGGER, error_config, seed, shard_size)
 
     # Write schema/meta "config" table TSVs (with VALVE metadata rows prepended), ex. table, column, datatype
-    serialize_schema_tables(schema_tables)
+    serialize_schema_tables(valve_schema_tables)
 
     # Map LinkML yaml data and serialize to VALVE data TSVs
     if data_dir is not None:
         map_data(yaml_schema_path, data_dir)
 
-    return schema_tables
+    return valve_schema_tables
 
 
 def serialize_schema_tables(schema_tables: List[dict]):
@@ -82,7 +115,7 @@ def serialize_schema_tables(schema_tables: List[dict]):
         LOGGER.debug(f"Wrote schema table {len(schema_table_dict['rows'])} rows to '{schema_table_path}'")
 
 
-def serialize_data_tables(schema_tables: List[dict], data_tables: List[dict]):
+def serialize_data_tables(schema_tables: List[dict], data_tables: List[dict], shard_size: int = None):
     # Serialize data tables listed in the Table table, and add data to them
     for schema_table_name in schema_tables:
         if schema_table_name == "table":
@@ -92,21 +125,25 @@ def serialize_data_tables(schema_tables: List[dict], data_tables: List[dict]):
                 table_path = table_row["path"]
                 table_headers = [c["column"] for c in schema_tables["column"]["rows"] if c["table"] == table_name]
                 table_data_rows = next((t for t in data_tables if t["table"] == table_name), {}).get("rows")
-                write_dicts2tsv(table_path, table_data_rows, table_headers)
+                # Enum tables are always written whole, since VALVE checks the foreign keys to them against the table TSV
+                if shard_size and len(table_data_rows or []) > shard_size and not is_enum_table(table_name, ENUM_PRIMARY_KEY, schema_tables["column"]["rows"]):
+                    # Keep a headers-only table for VALVE, and write the rows to shards listed in a manifest
+                    write_dicts2tsv(table_path, None, table_headers)
+                    write_sharded_tsv(table_path, [table_data_rows], table_headers, shard_size)
+                else:
+                    remove_shards(table_path)
+                    write_dicts2tsv(table_path, table_data_rows, table_headers)
                 if table_data_rows:
                     LOGGER.debug(f"Wrote data table {len(table_data_rows)} rows to '{table_path}'")
 
 
-def map_schema(yaml_schema_path: str, output_dir: str) -> dict[str, dict[str, str]]:
+def map_schema(yaml_schema_path: str, output_dir: str, import_dir: str = None, cache_dir: str = None) -> dict[str, dict[str, str]]:
     global SCHEMA_DEFAULT_RANGE
-    # Data tables go in a subdirectory of the schema directory by default
+    # Data tables go in a subdirectory of the schema directory by default. It's created when the data tables are written.
     data_table_dir = os.path.join(output_dir, "data")
-    if not os.path.isdir(data_table_dir):
-        os.mkdir(data_table_dir)
-        LOGGER.info(f"Created data directory '{data_table_dir}'")
 
-    # Parse schema
-    linkml_schema = SchemaView(yaml_schema_path)
+    # Parse schema, resolving imports offline
+    linkml_schema = resolve_schema_view(yaml_schema_path, import_dir, cache_dir, LOGGER)
     all_classes = linkml_schema.all_classes().values()
     all_slots = linkml_schema.all_slots().values()
     all_enums = linkml_schema.all_enums().values()
@@ -149,7 +186,8 @@ def map_schema(yaml_schema_path: str, output_dir: str) -> dict[str, dict[str, st
             "column": {"rows": all_column_rows, "path": output_dir + '/column.tsv'},
             "datatype": {"rows": all_datatype_rows, "path": output_dir + '/datatype.tsv'},
         },
-        "data_tables": data_tables
+        "data_tables": data_tables,
+        "linkml_schema": linkml_schema,
     }
 
 
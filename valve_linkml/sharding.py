@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import os
+import csv
+import sqlite3
+import logging
+from collections import deque
+from contextlib import closing
+from typing import List, Iterable, Iterator, Optional, Tuple
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .utils import write_dicts2tsv
+
+"""Usage: python3 -m valve_linkml.sharding <manifest-path> <sqlite-db-path> -t <table-name> -p <primary-key-column>"""
+
+LOGGER = logging.getLogger("sharding")
+
+MANIFEST_HEADERS = ["shard", "path", "first_row", "row_count"]
+ROW_NUMBER_COLUMN = "row_number"
+
+def main():
+    # Print info logs, ex. import resolution time, when run from the command line
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    # CLI
+    parser = ArgumentParser()
+    parser.add_argument('manifest_path', type=str, help="Path to the shard manifest TSV of a data table")
+    parser.add_argument('db_path', type=str, help="Path to the SQLite database to load the shards into")
+    parser.add_argument("-t", "--table", required=True, help="Name of the SQLite table to load the shards into")
+    parser.add_argument("-p", "--primary-key", help="Primary key column that must be unique across shards")
+    parser.add_argument("-w", "--workers", type=int, help="Number of shards to read concurrently")
+    parser.add_argument("-r", "--replace", action="store_true", help="Replace the SQLite table if it already exists")
+    args = parser.parse_args()
+
+    # Run
+    load_shards_into_sqlite(args.manifest_path, args.db_path, args.table, args.primary_key, args.workers, args.replace)
+
+
+def shard_path(table_path: str, shard: int) -> str:
+    """ex. data/Person.tsv => data/Person.00000.tsv"""
+    return f"{os.path.splitext(table_path)[0]}.{shard:05d}.tsv"
+
+def manifest_path(table_path: str) -> str:
+    """ex. data/Person.tsv => data/Person.manifest.tsv"""
+    return f"{os.path.splitext(table_path)[0]}.manifest.tsv"
+
+def manifest_table_path(manifest_path: str) -> str:
+    """ex. data/Person.manifest.tsv => data/Person.tsv"""
+    return f"{manifest_path[:-len('.manifest.tsv')]}.tsv"
+
+
+def write_sharded_tsv(table_path: str, batches: Iterable[List[dict]], headers: List[str], shard_size: int, max_workers: Optional[int] = None) -> List[dict]:
+    """Write a stream of row batches to TSV shards of shard_size rows (the last may be smaller), and then a manifest listing the shards in row order.
+    Shards are formatted and written in a process pool as soon as they're full, so only a few shards are held in memory at once.
+    Shards left over from an earlier, longer write of the table are removed.
+    The table path itself isn't written, so callers can keep a headers-only table there for the VALVE Table table."""
+    if shard_size < 1:
+        raise ValueError(f"Shard size must be at least 1, got {shard_size}")
+    manifest_dir = os.path.dirname(table_path)
+    max_workers = max_workers or os.cpu_count() or 1
+    manifest_rows = []
+    first_row = 0
+    with ProcessPoolExecutor(max_workers) as executor:
+        # Keep at most 2 shards per worker in flight, so memory use doesn't grow with the table
+        pending = deque()
+        for shard, rows in enumerate(split_shards(batches, shard_size)):
+            path = shard_path(table_path, shard)
+            manifest_rows.append({
+                "shard": shard,
+                "path": os.path.relpath(path, manifest_dir or "."),
+                "first_row": first_row,
+                "row_count": len(rows),
+            })
+            first_row += len(rows)
+            if max_workers == 1:
+                write_dicts2tsv(path, rows, headers)
+                continue
+            pending.append(executor.submit(write_dicts2tsv, path, rows, headers))
+            if len(pending) >= 2 * max_workers:
+                pending.popleft().result()
+        # Consume results so exceptions from shard writers are raised here
+        for future in pending:
+            future.result()
+
+    remove_shards(table_path, len(manifest_rows))
+    write_dicts2tsv(manifest_path(table_path), manifest_rows, MANIFEST_HEADERS)
+    LOGGER.debug(f"Wrote {first_row} rows to {len(manifest_rows)} shards listed in '{manifest_path(table_path)}'")
+    return manifest_rows
+
+
+def remove_shards(table_path: str, first_shard: int = 0):
+    """Remove the shards of a table from first_shard on, ex. left over from an earlier, longer write. Removing all of them removes the manifest too."""
+    if first_shard == 0 and os.path.isfile(manifest_path(table_path)):
+        os.remove(manifest_path(table_path))
+    shard = first_shard
+    while os.path.isfile(shard_path(table_path, shard)):
+        os.remove(shard_path(table_path, shard))
+        shard += 1
+
+
+def split_shards(batches: Iterable[List[dict]], shard_size: int) -> Iterator[List[dict]]:
+    """Regroup row batches of any size into shards of shard_size rows, and a last shard of the remaining rows"""
+    shard_rows = []
+    for batch in batches:
+        start = 0
+        while start < len(batch):
+            end = start + shard_size - len(shard_rows)
+            shard_rows.extend(batch[start:end])
+            start = end
+            if len(shard_rows) == shard_size:
+                yield shard_rows
+                shard_rows = []
+    if shard_rows:
+        yield shard_rows
+
+
+def read_manifest(manifest_path: str) -> List[dict]:
+    """Read a shard manifest, with shard paths resolved relative to the manifest, sorted by row order"""
+    manifest_dir = os.path.dirname(manifest_path)
+    with open(manifest_path, 'r') as manifest_file:
+        reader = csv.DictReader(manifest_file, delimiter='\t')
+        manifest_rows = [dict(row, path=os.path.join(manifest_dir, row["path"]), first_row=int(row["first_row"]), row_count=int(row["row_count"]))
+                         for row in reader]
+    return sorted(manifest_rows, key=lambda row: row["first_row"])
+
+
+def read_shard(manifest_row: dict) -> Tuple[List[str], List[list]]:
+    with open(manifest_row["path"], 'r') as shard_file:
+        reader = csv.reader(shard_file, delimiter='\t')
+        headers = next(reader)
+        rows = [[v if v != "" else None for v in row] for row in reader]
+    if len(rows) != manifest_row["row_count"]:
+        raise Exception(f"Error: Shard '{manifest_row['path']}' has {len(rows)} rows but the manifest lists {manifest_row['row_count']}")
+    return headers, rows
+
+
+def load_shards_into_sqlite(manifest_path: str, db_path: str, table_name: str, primary_key: Optional[str] = None, max_workers: Optional[int] = None,
+                           replace: bool = False) -> int:
+    """Load the shards listed in a manifest into one SQLite table. Shards are read ahead in a thread pool and inserted in row order,
+    with their global row number as the "row_number" column. If a primary key is given, it must be unique across all shards.
+    An existing table is only replaced if replace is set. The table is loaded in one transaction, so a failed load leaves the database unchanged.
+    If the manifest lists no shards, the table is created empty with the headers of the table TSV next to the manifest."""
+    manifest_rows = read_manifest(manifest_path)
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    row_count = 0
+    headers = None
+    with ThreadPoolExecutor(max_workers) as executor, closing(sqlite3.connect(db_path)) as connection, connection:
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone():
+            if not replace:
+                raise Exception(f"Error: Table '{table_name}' already exists in '{db_path}'. Pass --replace to load it again.")
+            LOGGER.info(f"Replacing table '{table_name}' in '{db_path}'")
+        # Begin explicitly, since sqlite3 doesn't begin a transaction for DROP and CREATE
+        connection.execute("BEGIN")
+        connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+
+        # Keep at most max_workers shards in flight so memory use doesn't grow with the table
+        pending = deque()
+        todo = iter(manifest_rows)
+        for manifest_row in todo:
+            pending.append((manifest_row, executor.submit(read_shard, manifest_row)))
+            if len(pending) >= max_workers: break
+        while pending:
+            manifest_row, future = pending.popleft()
+            next_manifest_row = next(todo, None)
+            if next_manifest_row is not None:
+                pending.append((next_manifest_row, executor.submit(read_shard, next_manifest_row)))
+
+            shard_headers, rows = future.result()
+            if headers is None:
+                headers = shard_headers
+                create_shard_table(connection, table_name, headers, primary_key)
+            elif shard_headers != headers:
+                raise Exception(f"Error: Shard '{manifest_row['path']}' headers {shard_headers} don't match {headers}")
+
+            insert = f'INSERT INTO "{table_name}" VALUES ({", ".join(["?"] * (len(headers) + 1))})'
+            try:
+                connection.executemany(insert, ([manifest_row["first_row"] + i] + row for i, row in enumerate(rows)))
+            except sqlite3.IntegrityError as e:
+                raise Exception(f"Error: Loading shard '{manifest_row['path']}' into '{table_name}' failed: {e}")
+            row_count += len(rows)
+
+        if headers is None:
+            headers = read_table_headers(manifest_table_path(manifest_path))
+            create_shard_table(connection, table_name, headers, primary_key)
+
+    LOGGER.info(f"Loaded {row_count} rows from {len(manifest_rows)} shards into '{db_path}' table '{table_name}'")
+    return row_count
+
+
+def read_table_headers(table_path: str) -> List[str]:
+    if not os.path.isfile(table_path):
+        raise Exception(f"Error: Table '{table_path}' not found to read the headers of a manifest without shards")
+    with open(table_path, 'r') as table_file:
+        return next(csv.reader(table_file, delimiter='\t'), [])
+
+
+def create_shard_table(connection: sqlite3.Connection, table_name: str, headers: List[str], primary_key: Optional[str]):
+    if primary_key is not None and primary_key not in headers:
+        raise ValueError(f"Primary key '{primary_key}' is not a column of '{table_name}'")
+    columns = [f'"{ROW_NUMBER_COLUMN}" INTEGER PRIMARY KEY'] + [f'"{h}" TEXT' for h in headers]
+    if primary_key is not None:
+        columns.append(f'UNIQUE("{primary_key}")')
+    connection.execute(f'CREATE TABLE "{table_name}" ({", ".join(columns)})')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import io
+import os
+import csv
+import mmap
+from collections import deque
+from typing import List, Dict, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+"""Read large CSV/TSV sources for external data mappers, ex. Synthea, as column-oriented batches: {"<column>": ["<value>", ...]}
+Files are memory-mapped and split into line-aligned byte ranges that are parsed in a process pool.
+Note: ranges are aligned on newlines, so quoted values must not contain newlines."""
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024 # bytes per parsed range
+
+
+def read_columns(source_path: str, columns: List[str], delimiter: str = ",", max_workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, List[str]]]:
+    """Yield batches of the given columns of a source file, in file order"""
+    if os.path.getsize(source_path) == 0:
+        return
+    with open(source_path, "rb") as source_file, mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+        header_end = source_map.find(b"\n")
+        header_end = len(source_map) if header_end == -1 else header_end
+        headers = next(csv.reader([source_map[:header_end].decode("utf-8-sig").rstrip("\r")], delimiter=delimiter))
+        missing_columns = [c for c in columns if c not in headers]
+        if missing_columns:
+            raise ValueError(f"Columns {', '.join(missing_columns)} not found in '{source_path}'")
+        column_indexes = [headers.index(c) for c in columns]
+        byte_ranges = split_line_ranges(source_map, header_end + 1, chunk_size)
+
+    # Parse small sources in this process, since starting workers would cost more than parsing
+    if len(byte_ranges) <= 1 or max_workers == 1:
+        for start, end in byte_ranges:
+            yield parse_range(source_path, start, end, columns, column_indexes, delimiter)
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers) as executor:
+        # Keep at most 2 ranges per worker in flight, so batches are yielded in order without buffering the whole file
+        pending = deque()
+        todo = iter(byte_ranges)
+        for start, end in todo:
+            pending.append(executor.submit(parse_range, source_path, start, end, columns, column_indexes, delimiter))
+            if len(pending) >= 2 * max_workers: break
+        while pending:
+            future = pending.popleft()
+            next_range = next(todo, None)
+            if next_range is not None:
+                pending.append(executor.submit(parse_range, source_path, *next_range, columns, column_indexes, delimiter))
+            yield future.result()
+
+
+def split_line_ranges(source_map: mmap.mmap, start: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Split [start, end of file) into byte ranges of about chunk_size that each end after a newline"""
+    byte_ranges = []
+    source_size = len(source_map)
+    while start < source_size:
+        end = source_map.find(b"\n", min(start + chunk_size, source_size) - 1)
+        end = source_size if end == -1 else end + 1
+        byte_ranges.append((start, end))
+        start = end
+    return byte_ranges
+
+
+def parse_range(source_path: str, start: int, end: int, columns: List[str], column_indexes: List[int], delimiter: str) -> Dict[str, List[str]]:
+    """Parse a line-aligned byte range of a source file into lists of the projected column values"""
+    with open(source_path, "rb") as source_file, mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+        text = source_map[start:end].decode("utf-8")
+    reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter)
+    # Project each row into the column lists as it's parsed, so only the needed values are kept
+    values = [[] for _ in columns]
+    column_appends = [(column_values.append, i) for column_values, i in zip(values, column_indexes)]
+    try:
+        for row in reader:
+            if not row: continue
+            for append, i in column_appends:
+                append(row[i])
+    except IndexError:
+        # Find the byte offset of the short row from the lines read so far, only on this error path
+        lines = io.StringIO(text, newline="").readlines()[:reader.line_num - 1]
+        row_offset = start + sum(len(line.encode("utf-8")) for line in lines)
+        min_row_length = max(column_indexes) + 1
+        raise ValueError(f"Row at byte offset {row_offset} of '{source_path}' has {len(row)} values, but column "
+                         f"'{columns[column_indexes.index(min_row_length - 1)]}' is value {min_row_length}") from None
+    return dict(zip(columns, values))